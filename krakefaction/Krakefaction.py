@@ -28,6 +28,9 @@ import os
 import argparse
 import sys
 import random
+import bisect
+import multiprocessing
+import array
 
 """
 # =============================================================================
@@ -44,11 +47,15 @@ PROGRAM_USAGE = "%(prog)s -u UNTRANSLATED -t TRANSLATED -o OUTPUT"
 
 # CONSTANTS
 
-CLASSIFIED = "C"
+CLASSIFIED = b"C"
+
+# The size of the input file buffers, in bytes.
+BUFFER_SIZE = 1 << 20
 
 # DEFAULTS #
 
 DEFAULT_RATE = 0.05
+DEFAULT_PROCESSES = 1
 
 # ARGUMENTS #
 
@@ -83,6 +90,13 @@ RATE_SHORT = SHORT + "r"
 RATE_HELP = "The sampling rate in the range (0, 1]. For example, a rate of \
     0.1 will generate 10 data points (0.1, 0.2, etc.)."
 
+PROCESSES = "processes"
+PROCESSES_LONG = LONG + PROCESSES
+PROCESSES_SHORT = SHORT + "p"
+PROCESSES_HELP = "The number of processes used to generate the rarefaction \
+    data. The input files are split into this many parts, which are sampled \
+    in parallel."
+
 # Version number
 VERSION = "version"
 VERSION_LONG = LONG + VERSION
@@ -104,6 +118,60 @@ This class represents a sample of reads from the entire input of reads.
 """
 class Sample:
 
+    """
+    # =========================================================================
+
+    CONSTRUCTOR
+    -----------
+
+
+    INPUT
+    -----
+
+    [FLOAT] [rate]
+        The sampling rate of this sample. This must be a number between (0, 1].
+
+    # =========================================================================
+    """
+    def __init__(self, rate):
+
+        self.rate = rate
+        self.numberOfReads = 0
+
+        # The number of unique principal classification rankings observed in
+        # the sample:
+        self.numberOfDomains = 0
+        self.numberOfPhylums = 0
+        self.numberOfClasses = 0
+        self.numberOfOrders = 0
+        self.numberOfFamilies = 0
+        self.numberOfGenera = 0
+        self.numberOfSpecies = 0
+        self.numberOfSubspecies = 0
+
+
+"""
+# =============================================================================
+
+OBSERVATIONS
+------------
+
+PURPOSE
+-------
+
+This class represents the taxonomic rankings observed in the entire input of
+reads. Each ranking is associated with the smallest random number drawn for any
+read classified with that ranking. Since a read belongs to every sample with a
+rate greater or equal to its random number, a ranking is observed in exactly
+the samples with a rate greater or equal to its smallest random number.
+
+Each ranking is assigned an integer identifier when it is first observed, and
+its rank identifier and smallest random number are stored by that integer.
+
+# =============================================================================
+"""
+class Observations:
+
     # Principal Classification Rankings:
     DOMAIN = "d"
     PHYLUM = "p"
@@ -114,6 +182,9 @@ class Sample:
     SPECIES = "s"
     SUBSPECIES = "s1"
 
+    RANKS = frozenset(
+        [DOMAIN, PHYLUM, CLASS, ORDER, FAMILY, GENERA, SPECIES, SUBSPECIES])
+
     # Kraken:
     KRAKEN_SEPARATOR = "__"
 
@@ -123,44 +194,79 @@ class Sample:
     CONSTRUCTOR
     -----------
 
+    # =========================================================================
+    """
+    def __init__(self):
+
+        # Ranking -> integer identifier:
+        self.identifiers = {}
+
+        # Integer identifier -> ranking, rank identifier, smallest random number:
+        self.rankings = []
+        self.ranks = []
+        self.minimums = array.array("d")
+
+    """
+    # =========================================================================
+
+    IDENTIFY
+    --------
+
+
+    PURPOSE
+    -------
+
+    Finds the integer identifier of the passed ranking. When a new taxonomic
+    ranking is observed, it will be assigned the next integer identifier.
+
 
     INPUT
     -----
 
-    [FLOAT] [rate]
-        The sampling rate of this sample. This must be a number between (0, 1].
+    [STRING] [rank]
+        The principal classification ranking, such as "d__Bacteria".
+
+    [STRING] [level]
+        The rank identifier of the ranking, such as "d".
+
+
+    RETURN
+    ------
+
+    [INT] [identifier]
+        The integer identifier of the ranking.
 
     # =========================================================================
     """
-    def __init__(self, rate):
+    def identify(self, rank, level):
 
-        self.rate = rate
-        self.numberOfReads = 0
+        identifier = self.identifiers.get(rank)
+
+        if identifier is None:
+
+            identifier = len(self.rankings)
+            self.identifiers[rank] = identifier
 
-        self.domainDictionary = {}
-        self.phylumDictionary = {}
-        self.classDictionary = {}
-        self.orderDictionary = {}
-        self.familyDictionary = {}
-        self.generaDictionary = {}
-        self.speciesDictionary = {}
-        self.subspeciesDictionary = {}
+            self.rankings.append(rank)
+            self.ranks.append(level)
+            self.minimums.append(float("inf")) # Not yet in any sample.
+
+        return identifier
 
     """
     # =========================================================================
 
-    UPDATE DICTIONARIES
-    -------------------
+    PARSE
+    -----
 
 
     PURPOSE
     -------
 
-    Updates the sample's dictionaries with the passed taxonomic rankings. These
-    dictionaries maintain the unique principal classification rankings that
-    have been observed. When a new taxonomic ranking is observed, it will be
-    added to the appropriate dictionary. When a previously seen taxonomic
-    ranking is observed, it will be ignored.
+    Parses the passed taxonomic rankings of a read into the entries to update
+    for each read with the same rankings. The rankings are passed over once,
+    and each principal classification ranking is recognized by the rank
+    identifier preceding its separator.
 
 
     INPUT
@@ -174,6 +280,65 @@ class Sample:
         example, "d__Bacteria" and "s__Prevotella_enoeca".
 
 
+    RETURN
+    ------
+
+    [INT LIST] [entries]
+        The integer identifiers of the principal classification rankings
+        within the [rankings].
+
+    # =========================================================================
+    """
+    def parse(self, rankings):
+
+        ranks = self.RANKS
+        separator = self.KRAKEN_SEPARATOR
+
+        entries = []
+
+        for rank in rankings:
+
+            # The rank identifier precedes the separator ("d__Bacteria").
+            end = rank.find(separator)
+
+            if end < 1:
+                continue
+
+            level = rank[:end]
+
+            if level not in ranks:
+                continue
+
+            # We found the right rank!
+            entries.append(self.identify(rank, level))
+
+        return entries
+
+    """
+    # =========================================================================
+
+    UPDATE
+    ------
+
+
+    PURPOSE
+    -------
+
+    Updates the observations with the parsed taxonomic rankings of a single
+    read. The random number of each of the read's rankings will be lowered to
+    the read's random number, if the read's is smaller.
+
+
+    INPUT
+    -----
+
+    [INT LIST] [entries]
+        The read's rankings, as parsed by these observations.
+
+    [FLOAT] [number]
+        The random number drawn for the read.
+
+
     RETURN
     ------
 
@@ -183,56 +348,40 @@ class Sample:
     POST
     ----
 
-    The principal classification ranking dictionaries will be updated,
-    according to the passed [rankings].
+    The principal classification ranking minimums will be updated, according
+    to the passed [entries] and [number].
 
     # =========================================================================
     """
-    def updateDictionaries(self, rankings):
+    def update(self, entries, number):
+
+        minimums = self.minimums
 
-        self.updateDictionary(self.domainDictionary, rankings, self.DOMAIN)
-        self.updateDictionary(self.phylumDictionary, rankings, self.PHYLUM)
-        self.updateDictionary(self.classDictionary, rankings, self.CLASS)
-        self.updateDictionary(self.orderDictionary, rankings, self.ORDER)
-        self.updateDictionary(self.familyDictionary, rankings, self.FAMILY)
-        self.updateDictionary(self.generaDictionary, rankings, self.GENERA)
-        self.updateDictionary(self.speciesDictionary, rankings, self.SPECIES)
-        self.updateDictionary(self.subspeciesDictionary, rankings, self.SUBSPECIES)
+        for identifier in entries:
+
+            if number < minimums[identifier]:
+                minimums[identifier] = number
 
     """
     # =========================================================================
 
-    UPDATE DICTIONARY
-    -----------------
+    MERGE
+    -----
 
 
     PURPOSE
     -------
 
-    Updates a particular dictionary with the passed taxonomic rankings. This
-    dictionary will maintain the unique pricipal taxonomic rankings that have
-    been observed. When a new taxonomic ranking is observed, it will be added
-    to the dictionary. When a previously seen taxonomic ranking is observed, it
-    will be ignored.
+    Merges the passed observations into these observations. Each ranking will
+    be associated with the smaller of its two random numbers.
 
 
     INPUT
     -----
 
-    [(STRING) -> (INT) DICTIONARY] [dictionary]
-        The dictionary to update. This dictionary must agree with the passed
-        [label].
-
-    [STRING LIST] [rankings]
-        A list of strings corresponding to specific taxonomic rankings. The
-        format of these strings must be consistant with Kraken's 'translation'
-        output. These strings must start with a rank identifier (d, p, c, p, f,
-        g, s), then two "_" characters ("__"), then the name ("Bacteria"). For
-        example, "d__Bacteria" and "s__Prevotella_enoeca".
-
-    [STRING] [label]
-        The label for a particular principal classification ranking (d, p, c,
-        p, f, g, s). This label must agree with the passed [dictionary].
+    [OBSERVATIONS] [other]
+        The observations to merge. These should be observations of different
+        reads than these observations.
 
 
     RETURN
@@ -244,25 +393,392 @@ class Sample:
     POST
     ----
 
-    The passed [dictionary] will be updated, according to the passed
-    [rankings] and [label].
+    These observations will contain the rankings of both observations.
 
     # =========================================================================
     """
-    def updateDictionary(self, dictionary, rankings, label):
+    def merge(self, other):
 
-        for rank in rankings:
+        minimums = self.minimums
+
+        for i in range(0, len(other.rankings)):
+
+            identifier = self.identify(other.rankings[i], other.ranks[i])
+
+            if other.minimums[i] < minimums[identifier]:
+                minimums[identifier] = other.minimums[i]
+
+    """
+    # =========================================================================
+
+    RANK MINIMUMS
+    -------------
+
+
+    PURPOSE
+    -------
+
+    Finds the smallest random numbers of the rankings of a rank.
+
+
+    INPUT
+    -----
+
+    [STRING] [level]
+        The rank identifier, such as "d".
+
+
+    RETURN
+    ------
+
+    [FLOAT LIST] [minimums]
+        The smallest random number of each observed ranking of the rank.
+
+    # =========================================================================
+    """
+    def rankMinimums(self, level):
+
+        return [self.minimums[i] for i in range(0, len(self.ranks))
+            if self.ranks[i] == level]
+
+
+"""
+# =============================================================================
+
+COUNT AT RATES
+--------------
+
+
+PURPOSE
+-------
+
+Counts, for each of the passed sampling rates, the passed random numbers that
+are less than or equal to the rate.
+
+
+INPUT
+-----
+
+[FLOAT ITERABLE] [numbers]
+    The random numbers to count.
+
+[FLOAT LIST] [rates]
+    The sampling rates, in ascending order.
+
+
+RETURN
+------
+
+[INT LIST] [counts]
+    The number of [numbers] less than or equal to each of the [rates], in the
+    same order as the [rates].
 
-            if rank.startswith(str(label) + self.KRAKEN_SEPARATOR):
+# =============================================================================
+"""
+def countAtRates(numbers, rates):
 
-                # We found the right rank!
-                # Check to see if it already exists in the dictory:
-                if rank in dictionary:
-                    dictionary[rank] += 1
+    # The number of numbers first included at each rate. The final entry counts
+    # the numbers greater than every rate.
+    tally = [0] * (len(rates) + 1)
 
-                else:
-                    dictionary[rank] = 1
+    for number in numbers:
+        tally[bisect.bisect_left(rates, number)] += 1
 
+    return accumulate(tally[:len(rates)])
+
+"""
+# =============================================================================
+
+ACCUMULATE
+----------
+
+
+PURPOSE
+-------
+
+Converts the number of items first included at each sampling rate into the
+number of items included at each sampling rate. Every item included at a rate
+is included at all larger rates.
+
+
+INPUT
+-----
+
+[INT LIST] [tally]
+    The number of items first included at each rate, in ascending order of
+    rate.
+
+
+RETURN
+------
+
+[INT LIST] [counts]
+    The number of items included at each rate, in the same order as the
+    [tally].
+
+# =============================================================================
+"""
+def accumulate(tally):
+
+    counts = []
+    total = 0
+
+    for count in tally:
+        total += count
+        counts.append(total)
+
+    return counts
+
+
+"""
+# =============================================================================
+
+SPLIT INPUT
+-----------
+
+
+PURPOSE
+-------
+
+Splits the Kraken files into ranges of reads that may be processed
+independently. The untranslated file is split into ranges of roughly equal
+size, aligned to the start of lines. Each range is matched with the position
+of its first translation in the translated file, which is found by counting
+the classified reads that precede the range.
+
+
+INPUT
+-----
+
+[FILE LOCATION] [untranslatedLocation]
+    The file location of the untranslated Kraken output. This file is generated
+    by running 'kraken' and may be filtered or unfiltered Kraken output.
+
+[FILE LOCATION] [translatedLocation]
+    The file location of the translated Kraken output. This file is generated
+    by running 'kraken-translate'.
+
+[INT] [parts]
+    The number of ranges to split the files into. This must be at least 1.
+
+
+RETURN
+------
+
+[(INT, INT, INT) LIST] [ranges]
+    The ranges of reads, in file order. Each range is the position of its
+    first untranslated line, the position following its last untranslated
+    line, and the position of its first translated line.
+
+# =============================================================================
+"""
+def splitInput(untranslatedLocation, translatedLocation, parts):
+
+    size = os.path.getsize(untranslatedLocation)
+
+    untranslatedFile = open(untranslatedLocation, 'rb', BUFFER_SIZE)
+    translatedFile = open(translatedLocation, 'rb', BUFFER_SIZE)
+
+    # Find the start of the line following each equal division of the file.
+    starts = [0]
+
+    for i in range(1, parts):
+
+        untranslatedFile.seek(max(i * size // parts - 1, starts[-1]))
+        untranslatedFile.readline()
+        starts.append(max(untranslatedFile.tell(), starts[-1]))
+
+    ends = starts[1:] + [size]
+
+    # Count the classified reads preceding each range, by counting the lines
+    # starting with the classified marker.
+    untranslatedFile.seek(0)
+    classified = [0]
+    previous = b"\n" # The start of the file starts a line.
+
+    for end in ends[:-1]:
+
+        count = classified[-1]
+
+        while untranslatedFile.tell() < end:
+
+            block = untranslatedFile.read(
+                min(BUFFER_SIZE, end - untranslatedFile.tell()))
+            count += (previous + block).count(b"\n" + CLASSIFIED)
+            previous = block[-1:]
+
+        classified.append(count)
+
+    # Find the start of the translation of the first classified read in each
+    # range. Each classified read has exactly one translated line.
+    translatedStarts = [0]
+    lines = 0
+    position = 0
+
+    for count in classified[1:]:
+
+        while lines < count:
+
+            block = translatedFile.read(BUFFER_SIZE)
+
+            if not block:
+                break
+
+            # Does the needed line start after this block?
+            newlines = block.count(b"\n")
+
+            if lines + newlines < count:
+                lines += newlines
+                position += len(block)
+                continue
+
+            offset = 0
+
+            while lines < count:
+                offset = block.index(b"\n", offset) + 1
+                lines += 1
+
+            position += offset
+            translatedFile.seek(position)
+
+        translatedStarts.append(position)
+
+    untranslatedFile.close()
+    translatedFile.close()
+
+    return list(zip(starts, ends, translatedStarts))
+
+"""
+# =============================================================================
+
+OBSERVE RANGE
+-------------
+
+
+PURPOSE
+-------
+
+Observes the reads in a range of the Kraken files. Each read is assigned a
+random number, which determines the subsamples it belongs to, and its
+taxonomic rankings are observed with that number.
+
+
+INPUT
+-----
+
+[TUPLE] [task]
+    The reads to observe, as the tuple: (untranslatedLocation,
+    translatedLocation, rates, untranslatedStart, untranslatedEnd,
+    translatedStart). The locations are those of the Kraken files, the rates
+    are the sampling rates in ascending order, and the positions are a range
+    as generated by splitInput.
+
+
+RETURN
+------
+
+[(INT LIST, OBSERVATIONS)] [(reads, observations)]
+    The number of reads in the range belonging to each subsample, in the same
+    order as the rates, and the observations of the reads in the range.
+
+# =============================================================================
+"""
+def observeRange(task):
+
+    (untranslatedLocation, translatedLocation, rates,
+        untranslatedStart, untranslatedEnd, translatedStart) = task
+
+    # The number of reads first included in each subsample:
+    firsts = [0] * len(rates)
+    observations = Observations()
+
+    # Classification (undecoded) -> its parsed rankings:
+    parsed = {}
+
+    # An empty range has no reads.
+    if untranslatedEnd <= untranslatedStart:
+        return (accumulate(firsts), observations)
+
+    # Open the files.
+    # The files are read as bytes: only the first character of the untranslated
+    # lines is needed, so those lines are never decoded.
+    untranslatedFile = open(untranslatedLocation, 'rb', BUFFER_SIZE)
+    translatedFile = open(translatedLocation, 'rb', BUFFER_SIZE)
+
+    untranslatedFile.seek(untranslatedStart)
+    translatedFile.seek(translatedStart)
+
+    # Python's generator (Mersenne Twister) is drawn from directly, once per
+    # read, so a seeded run reproduces the same subsamples.
+    draw = random.random
+
+    # The functions and values used for every read are bound locally, rather
+    # than looked up again for each read:
+    readTranslation = translatedFile.readline
+    firstSample = bisect.bisect_left
+    lookup = parsed.get
+    update = observations.update
+    numberOfSamples = len(rates)
+
+    remaining = untranslatedEnd - untranslatedStart
+
+    # Iterate over all the reads in the range of the untranslated file.
+    for untranslatedLine in untranslatedFile:
+
+        if remaining <= 0:
+            break
+
+        remaining -= len(untranslatedLine)
+
+        number = draw() # Generate a random number once per read!
+        # We generate this random number once because we want all reads to
+        # be in all samples that are "bigger" (have a higher probability).
+
+        # The read belongs to every sample with a rate greater or equal to the
+        # random number. Since the rates are ascending, these samples are
+        # exactly the ones starting from the first such rate.
+        first = firstSample(rates, number)
+
+        # Is the read in no subsample (larger than every rate)?
+        # Then only its translation, if any, needs to be passed over.
+        if first == numberOfSamples:
+
+            if untranslatedLine[:1] == CLASSIFIED:
+                readTranslation()
+
+            continue
+
+        # The read is added to each subsample from the first, when the reads
+        # are counted after the pass.
+        firsts[first] += 1
+
+        # Is the read classified?
+        # We only want to do this work once for all the sampling rates!
+        if untranslatedLine[:1] == CLASSIFIED:
+
+            # Advance the translated file to find the translation.
+            translatedLine = readTranslation()
+
+            # Tokenize the translation: the read name, then the classification.
+            # Only the classification is needed, so the rest is not split.
+            classification = translatedLine.split(None, 2)[1]
+
+            # Many reads share a classification, so each is decoded and split
+            # into its rankings only once.
+            entries = lookup(classification)
+
+            if entries is None:
+                rankings = classification.decode("utf-8").split("|")
+                entries = observations.parse(rankings)
+                parsed[classification] = entries
+
+            update(entries, number)
+
+    # Close input files.
+    untranslatedFile.close()
+    translatedFile.close()
+
+    return (accumulate(firsts), observations)
 
 """
 # =============================================================================
@@ -292,6 +808,11 @@ INPUT
     A list of sub-sampling lists. These are the data points for which to
     generate rarefaction data.
 
+[INT] [processes]
+    The number of processes to generate the rarefaction data with. When more
+    than one, the files are split into ranges of reads that are observed in
+    parallel, each with an independently seeded random number generator.
+
 
 RETURN
 ------
@@ -306,51 +827,74 @@ The generated rarefaction data will be associated with the passed [samples].
 
 # =============================================================================
 """
-def generateRarefaction(untranslatedLocation, translatedLocation, samples):
+def generateRarefaction(
+        untranslatedLocation, translatedLocation, samples, processes=1):
 
-    # Open the files.
-    untranslatedFile = open(untranslatedLocation, 'r')
-    translatedFile = open(translatedLocation, 'r')
+    # The samples are bisected by rate, so they must be in ascending order.
+    samples = sorted(samples, key=lambda sample: sample.rate)
 
-    # Iterate over all the reads in the untranslated file.
-    for untranslatedLine in untranslatedFile:
+    # The sampling rates, in ascending order, parallel to [samples].
+    rates = [sample.rate for sample in samples]
 
-        number = random.random() # Generate a random number once per read!
-        # We generate this random number once because we want all reads to
-        # be in all sampling rate dictionaries that are "bigger" (have a
-        # higher probability).
+    # Observe the reads in each range:
+    ranges = splitInput(untranslatedLocation, translatedLocation, processes)
+    tasks = [(untranslatedLocation, translatedLocation, rates) + bounds
+        for bounds in ranges]
 
-        # Is the read classified?
-        # We only want to do this work once for all the sampling rates!
-        if untranslatedLine[0] == CLASSIFIED:
+    if processes == 1:
+        results = [observeRange(task) for task in tasks]
 
-            # Advance the translated file to find the translation.
-            translatedLine = translatedFile.readline()
-            
-            # Tokenize the translation.
-            tokens = translatedLine.strip().split()
-            read = tokens[0].strip()
-            classification = tokens[1].strip()
+    else:
 
-            rankings = classification.split("|")
+        # Each worker reseeds its generator, instead of inheriting the parent's.
+        pool = multiprocessing.Pool(processes, random.seed)
 
-        # Operate on each sampling rate:
-        for i in range(0, len(samples)):
+        # The workers are released even when one of them raises.
+        try:
+            results = pool.map(observeRange, tasks)
 
-            # Do we add the read to the subsample (classified and unclassied)?
-            # Include the read if its sampling rate is greater or equal.
-            if number <= samples[i].rate:
+        finally:
+            pool.close()
+            pool.join()
 
-                samples[i].numberOfReads += 1 # Increment the number of reads.
+    # Combine the observations of each range:
+    observations = Observations()
 
-                # Is the read classified?
-                # Update the dictionaries.
-                if untranslatedLine[0] == CLASSIFIED:
-                    samples[i].updateDictionaries(rankings)
+    for reads, rangeObservations in results:
 
-    # Close input files.
-    untranslatedFile.close()
-    translatedFile.close()
+        observations.merge(rangeObservations)
+
+        for i in range(0, len(samples)):
+            samples[i].numberOfReads += reads[i]
+
+    # Count the rankings observed in each subsample.
+    domains = countAtRates(
+        observations.rankMinimums(Observations.DOMAIN), rates)
+    phylums = countAtRates(
+        observations.rankMinimums(Observations.PHYLUM), rates)
+    classes = countAtRates(
+        observations.rankMinimums(Observations.CLASS), rates)
+    orders = countAtRates(
+        observations.rankMinimums(Observations.ORDER), rates)
+    families = countAtRates(
+        observations.rankMinimums(Observations.FAMILY), rates)
+    genera = countAtRates(
+        observations.rankMinimums(Observations.GENERA), rates)
+    species = countAtRates(
+        observations.rankMinimums(Observations.SPECIES), rates)
+    subspecies = countAtRates(
+        observations.rankMinimums(Observations.SUBSPECIES), rates)
+
+    for i in range(0, len(samples)):
+
+        samples[i].numberOfDomains = domains[i]
+        samples[i].numberOfPhylums = phylums[i]
+        samples[i].numberOfClasses = classes[i]
+        samples[i].numberOfOrders = orders[i]
+        samples[i].numberOfFamilies = families[i]
+        samples[i].numberOfGenera = genera[i]
+        samples[i].numberOfSpecies = species[i]
+        samples[i].numberOfSubspecies = subspecies[i]
 
 """
 # =============================================================================
@@ -389,77 +933,23 @@ The rarefaction data associated with the [samples] will be written to the
 """
 def writeResults(samples, outputFile):
 
-    last = len(samples) - 1
-
-    # Rates
-    outputFile.write("rates,")
-    for i in range(0, len(samples) - 1):
-        outputFile.write(str(samples[i].rate) + ",")
-    outputFile.write(str(samples[last].rate)) # last
-    outputFile.write("\n")
-
-    # Number of reads in each subsample:
-    outputFile.write("reads,")
-    for i in range(0, len(samples) - 1):
-        outputFile.write(str(samples[i].numberOfReads) + ",")
-    outputFile.write(str(samples[last].numberOfReads)) # last
-    outputFile.write("\n")
-
-    # Domains
-    outputFile.write("domains,")
-    for i in range(0, len(samples) - 1):
-        outputFile.write(str(len(samples[i].domainDictionary)) + ",")
-    outputFile.write(str(len(samples[last].domainDictionary))) # last
-    outputFile.write("\n")
-
-    # Phylums
-    outputFile.write("phylums,")
-    for i in range(0, len(samples) - 1):
-        outputFile.write(str(len(samples[i].phylumDictionary)) + ",")
-    outputFile.write(str(len(samples[last].phylumDictionary))) # last
-    outputFile.write("\n")
-
-    # Classes
-    outputFile.write("classes,")
-    for i in range(0, len(samples) - 1):
-        outputFile.write(str(len(samples[i].classDictionary)) + ",")
-    outputFile.write(str(len(samples[last].classDictionary))) # last
-    outputFile.write("\n")
-
-    # Orders
-    outputFile.write("orders,")
-    for i in range(0, len(samples) - 1):
-        outputFile.write(str(len(samples[i].orderDictionary)) + ",")
-    outputFile.write(str(len(samples[last].orderDictionary))) # last
-    outputFile.write("\n")
-
-    # Families
-    outputFile.write("families,")
-    for i in range(0, len(samples) - 1):
-        outputFile.write(str(len(samples[i].familyDictionary)) + ",")
-    outputFile.write(str(len(samples[last].familyDictionary))) # last
-    outputFile.write("\n")
-
-    # Genera
-    outputFile.write("genera,")
-    for i in range(0, len(samples) - 1):
-        outputFile.write(str(len(samples[i].generaDictionary)) + ",")
-    outputFile.write(str(len(samples[last].generaDictionary))) # last
-    outputFile.write("\n")
-
-    # Species
-    outputFile.write("species,")
-    for i in range(0, len(samples) - 1):
-        outputFile.write(str(len(samples[i].speciesDictionary)) + ",")
-    outputFile.write(str(len(samples[last].speciesDictionary))) # last
-    outputFile.write("\n")
-
-    # Subspecies
-    outputFile.write("subspecies,")
-    for i in range(0, len(samples) - 1):
-        outputFile.write(str(len(samples[i].subspeciesDictionary)) + ",")
-    outputFile.write(str(len(samples[last].subspeciesDictionary))) # last
-    outputFile.write("\n")
+    # Label -> the value of each sample:
+    rows = [
+        ("rates", [sample.rate for sample in samples]),
+        ("reads", [sample.numberOfReads for sample in samples]),
+        ("domains", [sample.numberOfDomains for sample in samples]),
+        ("phylums", [sample.numberOfPhylums for sample in samples]),
+        ("classes", [sample.numberOfClasses for sample in samples]),
+        ("orders", [sample.numberOfOrders for sample in samples]),
+        ("families", [sample.numberOfFamilies for sample in samples]),
+        ("genera", [sample.numberOfGenera for sample in samples]),
+        ("species", [sample.numberOfSpecies for sample in samples]),
+        ("subspecies", [sample.numberOfSubspecies for sample in samples])]
+
+    # Write each row as a comma-separated line, all in one call:
+    outputFile.writelines(
+        label + "," + ",".join(map(str, values)) + "\n"
+        for label, values in rows)
 
 """
 # =============================================================================
@@ -491,6 +981,10 @@ INPUT
 [FLOAT] [rate]
     The sampling rate of this sample. This must be a number between (0, 1].
 
+[INT] [processes]
+    The number of processes to generate the rarefaction data with. This must
+    be at least 1.
+
 
 RETURN
 ------
@@ -505,7 +999,8 @@ The rarefaction data will be generated and writen to the [outputLocation].
 
 # =============================================================================
 """
-def run(untranslatedLocation, translatedLocation, outputLocation, rate):
+def run(untranslatedLocation, translatedLocation, outputLocation, rate,
+        processes=None):
 
     # Check the untranslated file.
     if not os.path.isfile(untranslatedLocation):
@@ -526,6 +1021,15 @@ def run(untranslatedLocation, translatedLocation, outputLocation, rate):
         raise RuntimeError(
             "ERROR: The rate is not in range (0, 1]: " + str(rate) + "\n")
 
+    if processes is None:
+        processes = DEFAULT_PROCESSES
+
+    # Check the number of processes.
+    if processes < 1:
+        raise RuntimeError(
+            "ERROR: The number of processes is less than 1: "
+            + str(processes) + "\n")
+
     # Open the output file.
     outputFile = open(outputLocation, 'w')
 
@@ -538,7 +1042,8 @@ def run(untranslatedLocation, translatedLocation, outputLocation, rate):
         samples.append(Sample(i * rate))
 
     # Main logic:
-    generateRarefaction(untranslatedLocation, translatedLocation, samples)
+    generateRarefaction(
+        untranslatedLocation, translatedLocation, samples, processes)
     writeResults(samples, outputFile)
 
     # Close output file.
@@ -557,8 +1062,10 @@ def parse(parameters):
     translatedLocation = parameters.get(TRANSLATED)
     outputLocation = parameters.get(OUTPUT)
     rate = parameters.get(RATE)
+    processes = parameters.get(PROCESSES)
 
-    run(untranslatedLocation, translatedLocation, outputLocation, rate)
+    run(untranslatedLocation, translatedLocation, outputLocation, rate,
+        processes)
 
 """
 # =============================================================================
@@ -615,6 +1122,13 @@ def main():
         help=RATE_HELP,
         type=float)
 
+    optional.add_argument(
+        PROCESSES_SHORT,
+        PROCESSES_LONG,
+        dest=PROCESSES,
+        help=PROCESSES_HELP,
+        type=int)
+
     args = parser.parse_args()
     parameters = vars(args)
 